@@ -1,10 +1,70 @@
 import argparse
 import sys
+from binascii import hexlify
+from itertools import islice
+from multiprocessing import Pool
+
 from zokrates_pycrypto.gadgets.pedersenHasher import PedersenHasher
 from zokrates_pycrypto.babyjubjub import Point
-from zokrates_pycrypto.eddsa import PrivateKey, PublicKey
+from zokrates_pycrypto.eddsa import PrivateKey, PublicKey, batch_verify
 from zokrates_pycrypto.field import FQ
 
+# Number of stdin lines handed to the worker pool at once by batch_hasher
+BATCH_LINES = 4096
+
+# Per-process hasher of the batch_hasher worker pool, see `_init_hasher`
+_hasher = None
+
+
+def _init_hasher(personalisation):
+    global _hasher
+    _hasher = PedersenHasher(personalisation)
+
+
+def _hash_preimage(preimage):
+    return _hasher.hash_bytes(preimage).compress()
+
+
+def _read_preimage(line, size):
+    preimage = bytes.fromhex(line)
+    if len(preimage) != size:
+        raise ValueError(
+            "Bad length for preimage: {} vs {}".format(len(preimage), size)
+        )
+    return preimage
+
+
+def _read_preimages(lines, size):
+    """
+    Decodes a chunk of hex encoded preimages with a single `bytes.fromhex` call.
+    Returns the preimages and None. If a line is invalid, the chunk is decoded line
+    by line instead, and the preimages before the bad line are returned with its
+    error, so that their digests are still written before it is raised.
+    """
+    if all(len(x) == 2 * size for x in lines):
+        try:
+            data = bytes.fromhex("".join(lines))
+        except ValueError:
+            data = b""
+        if len(data) == size * len(lines):  # fromhex skips embedded whitespace
+            return [data[i : i + size] for i in range(0, len(data), size)], None
+    preimages = []
+    for x in lines:
+        try:
+            preimages.append(_read_preimage(x, size))
+        except ValueError as e:
+            return preimages, e
+    return preimages, None
+
+
+def _read_signature(r_hex, s_hex):
+    """
+    Parses a hex encoded signature into the (R, S) tuple used by `PublicKey.verify`.
+    S is kept as an integer, wrapping it in FQ would reduce it modulo the field
+    instead of the (larger) group order.
+    """
+    return Point.decompress(bytes.fromhex(r_hex)), int(s_hex, 16)
+
 
 def main():
     parser = argparse.ArgumentParser(description="pycrypto command-line interface")
@@ -78,6 +138,14 @@ def main():
         help="Provide signaure as space separated hex sting (2x 64 chars)",
     )
 
+    # EdDSA batch verify subcommand
+    subparsers.add_parser(
+        "batch-verify",
+        help="Verifies EdDSA signatures read from stdin, one line per signature: "
+        "public key, message, signature R and S as space separated hex strings. "
+        "Returns boolean flag for success of all signatures",
+    )
+
     args = parser.parse_args()
     subparser_name = args.subparser_name
 
@@ -98,45 +166,60 @@ def main():
 
     elif subparser_name == "batch_hasher":
         personalisation = args.personalisation.encode("ascii")
-        ph = PedersenHasher(personalisation)
-        try:
-            while True:
-                x = input()
-                if x == "exit":
-                    sys.exit(0)
-                preimage = bytes.fromhex(x)
-                if len(preimage) != args.size:
-                    raise ValueError(
-                        "Bad length for preimage: {} vs {}".format(len(preimage), 64)
-                    )
-                point = ph.hash_bytes(preimage)
-                digest = point.compress()
-                assert len(digest.hex()) == 32 * 2  # check for correct length
-                print(digest.hex())
-        except EOFError:
-            pass
+        if sys.stdin.isatty():
+            # interactive prompt: answer every line as soon as it is entered
+            _init_hasher(personalisation)
+            try:
+                while True:
+                    x = input()
+                    if x == "exit":
+                        sys.exit(0)
+                    digest = _hash_preimage(_read_preimage(x, args.size))
+                    assert len(digest.hex()) == 32 * 2  # check for correct length
+                    print(digest.hex())
+            except EOFError:
+                pass
+        else:
+            # piped input: hash chunks of lines on all cores, keeping input order
+            out = sys.stdout.buffer
+            with Pool(initializer=_init_hasher, initargs=(personalisation,)) as pool:
+                for chunk in iter(lambda: list(islice(sys.stdin, BATCH_LINES)), []):
+                    lines = [line.strip() for line in chunk]
+                    done = "exit" in lines
+                    if done:
+                        lines = lines[: lines.index("exit")]
+                    preimages, error = _read_preimages(lines, args.size)
+                    digests = pool.imap(_hash_preimage, preimages, chunksize=64)
+                    digests = b"".join(digests)
+                    if digests:
+                        # one hex digest per line, written once per chunk
+                        out.write(hexlify(digests, b"\n", 32) + b"\n")
+                        out.flush()
+                    if error is not None:
+                        raise error
+                    if done:
+                        break
 
     elif subparser_name == "keygen":
         if args.from_private:
-            fe = FQ(int(args.from_private[0]))
+            fe = FQ(int(args.from_private, 16))
             sk = PrivateKey(fe)
         else:
             sk = PrivateKey.from_rand()
         pk = PublicKey.from_private(sk)
 
         pk_hex = pk.p.compress().hex()
-        sk_hex = hex(sk.fe.n)[2:]
+        sk_hex = "{:064x}".format(sk.fe.n)
 
         print("PrivateKey PublicKey", file=sys.stderr)
         print("{} {}".format(sk_hex, pk_hex))
 
     elif subparser_name == "sig-gen":
-        sk_hex = int(args.private_key[0], 16)
-        sk = PrivateKey(FQ(sk_hex))
+        sk = PrivateKey(FQ(int(args.private_key[0], 16)))
         msg = bytes.fromhex(args.message[0])
 
         (r, s) = sk.sign(msg)
-        s_hex = hex(s)[2:]
+        s_hex = "{:064x}".format(s)
         r_hex = r.compress().hex()
 
         print("Signature_R Signature_S", file=sys.stderr)
@@ -148,15 +231,29 @@ def main():
         pk_hex = args.public_key[0]
 
         pk = PublicKey(Point.decompress(bytes.fromhex(pk_hex)))
-        r = Point.decompress(bytes.fromhex(r_hex))
-        s = FQ(int(s_hex, 16))
+        sig = _read_signature(r_hex, s_hex)
 
-        success = pk.verify((r, s), msg)
+        success = pk.verify(sig, msg)
         if success:
             sys.exit(0)
         else:
             sys.exit("Could not verfiy signature")
 
+    elif subparser_name == "batch-verify":
+        items = []
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            pk_hex, msg_hex, r_hex, s_hex = line.split()
+            pk = PublicKey(Point.decompress(bytes.fromhex(pk_hex)))
+            sig = _read_signature(r_hex, s_hex)
+            items.append((pk, sig, bytes.fromhex(msg_hex)))
+
+        if batch_verify(items):
+            sys.exit(0)
+        else:
+            sys.exit("Could not verify signatures")
+
     else:
         raise NotImplementedError(
             "Sub-command not implemented: {}".format(subparser_name)
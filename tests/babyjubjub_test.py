@@ -3,8 +3,13 @@ import unittest
 from os import urandom
 
 from zokrates_pycrypto.field import FQ
-from zokrates_pycrypto.babyjubjub import Point
-from zokrates_pycrypto.babyjubjub import JUBJUB_E, JUBJUB_C, JUBJUB_L
+from zokrates_pycrypto.numbertheory import SquareRootError
+from zokrates_pycrypto.babyjubjub import Point, msm, wnaf_mult, wnaf_table
+from zokrates_pycrypto.babyjubjub import comb_mult, comb_table, pow2_multiples
+from zokrates_pycrypto.babyjubjub import ladder_mult
+from zokrates_pycrypto.babyjubjub import lookup_sum, signed_window_table
+from zokrates_pycrypto.babyjubjub import JUBJUB_E, JUBJUB_C, JUBJUB_L, MSM_STRAUS_MAX
+from zokrates_pycrypto.babyjubjub import wnaf_multi_mult
 
 
 class TestJubjub(unittest.TestCase):
@@ -34,6 +39,11 @@ class TestJubjub(unittest.TestCase):
         G_mult2 = G.mult(2)
         self.assertEqual(G_mult2, self._point_g_dbl())
 
+    def test_mult_negative(self):
+        G = self._point_g()
+        self.assertEqual(G.mult(-3), G.mult(3).neg())
+        self.assertEqual(G * -1, G.neg())
+
     def test_lower_order_p(self):
         lp = Point(
             FQ(
@@ -72,6 +82,89 @@ class TestJubjub(unittest.TestCase):
         self.assertEqual(res2, res3)
         self.assertEqual(res1, res3)
 
+    def test_wnaf_mult(self):
+        G = self._point_g()
+        table = wnaf_table(G, 5)
+        rnd = int.from_bytes(urandom(32), "big")
+        for k in [0, 1, 2, 15, 16, 17, JUBJUB_L - 1, rnd]:
+            self.assertEqual(wnaf_mult(table, k, 5), ladder_mult(G, k))
+
+    def test_comb_mult(self):
+        G = self._point_g()
+        table = comb_table(G, 4, 64)
+        for k in [0, 1, 8, 9, 15, 16, 2 ** 64 - 1, int.from_bytes(urandom(8), "big")]:
+            self.assertEqual(comb_mult(table, k, 4), G.mult(k))
+        with self.assertRaises(ValueError):
+            comb_mult(table, 2 ** 72, 4)
+
+    def test_mult_base(self):
+        G = self._point_g()
+        for k in [0, 1, JUBJUB_E - 1, JUBJUB_E + 5, int.from_bytes(urandom(32), "big")]:
+            self.assertEqual(Point.mult_base(k), G.mult(k))
+        self.assertEqual(Point.mult_base(FQ(1234)), G.mult(1234))
+
+    def test_ladder_mult(self):
+        G = self._point_g()
+        for k in [0, 1, 2, JUBJUB_L, JUBJUB_E - 1, int.from_bytes(urandom(32), "big")]:
+            self.assertEqual(ladder_mult(G, k), G.mult(k))
+
+    def test_mul_pow2(self):
+        G = self._point_g()
+        self.assertEqual(G.mul_pow2(0), G)
+        self.assertEqual(G.mul_pow2(1), G.double())
+        self.assertEqual(G.mul_pow2(4), G.mult(16))
+
+    def test_pow2_multiples(self):
+        G = self._point_g()
+        multiples = pow2_multiples(G, 5, 4)
+        self.assertEqual(multiples, [G.mult(16 ** i) for i in range(5)])
+
+    def test_msm(self):
+        G = self._point_g()
+        points = [G.mult(i + 2) for i in range(10)]
+        scalars = [int.from_bytes(urandom(32), "big") for _ in points]
+        expected = Point.infinity()
+        for k, p in zip(scalars, points):
+            expected += p.mult(k)
+        self.assertEqual(msm(scalars, points), expected)
+        # enough points for the bucket method
+        points = pow2_multiples(G, MSM_STRAUS_MAX + 2)
+        scalars = [int.from_bytes(urandom(32), "big") for _ in points]
+        tables = [wnaf_table(p, 5) for p in points]
+        self.assertEqual(msm(scalars, points), wnaf_multi_mult(tables, scalars, 5))
+
+    def test_signed_window_table(self):
+        G = self._point_g()
+        table = signed_window_table(G)
+        for w in range(8):
+            expected = G.mult((w & 0b11) + 1)
+            if w & 0b100:
+                expected = expected.neg()
+            self.assertEqual(lookup_sum([table], [w]), expected)
+        self.assertEqual(lookup_sum([table, table], [3, 5]), G.mult(2))
+
+    def test_from_y(self):
+        G = self._point_g()
+        self.assertEqual(Point.from_y(G.y), G)
+        self.assertIn(Point.from_x(G.x), (G, Point(G.x, -G.y)))
+        # y = 2 is not on the curve
+        with self.assertRaises(SquareRootError):
+            Point.from_y(FQ(2))
+
+    def test_decompress(self):
+        P = self._point_g().mult(1234)
+        data = P.compress()
+        for point in [data, bytearray(data), memoryview(data)]:
+            self.assertEqual(Point.decompress(point), P)
+
+    def test_immutable(self):
+        G = self._point_g()
+        with self.assertRaises(AttributeError):
+            G.x = FQ(1)
+        with self.assertRaises(AttributeError):
+            del G.y
+        self.assertEqual(G, self._point_g())
+
     def test_identities(self):
         G = self._point_g()
         self.assertEqual(G + Point.infinity(), G)
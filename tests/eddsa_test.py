@@ -2,8 +2,14 @@ import unittest
 from os import urandom
 
 from zokrates_pycrypto.field import FQ
-from zokrates_pycrypto.babyjubjub import Point
-from zokrates_pycrypto.eddsa import PublicKey, PrivateKey
+from zokrates_pycrypto.babyjubjub import JUBJUB_E, JUBJUB_L, Point
+from zokrates_pycrypto.eddsa import (
+    PublicKey,
+    PrivateKey,
+    batch_verify,
+    hash_ram,
+    hash_to_scalar,
+)
 
 
 class TestEdDSA(unittest.TestCase):
@@ -19,6 +25,62 @@ class TestEdDSA(unittest.TestCase):
 
         pk = PublicKey.from_private(sk)
         self.assertTrue(pk.verify(sig, msg))
+        self.assertEqual(sk.sign(msg, pk=pk), sig)
+
+    def test_from_rand(self):
+        for _ in range(16):
+            self.assertLess(PrivateKey.from_rand().fe.n, JUBJUB_L)
+
+    def test_verify_rejects(self):
+        sk = PrivateKey.from_rand()
+        pk = PublicKey.from_private(sk)
+        msg = urandom(32)
+        R, S = sk.sign(msg)
+        self.assertFalse(pk.verify((R, S), urandom(32)))
+        self.assertFalse(pk.verify((R, S + 1), msg))
+        self.assertTrue(pk.verify((R, S), msg, B=Point.generator()))
+        self.assertFalse(pk.verify((R, S + 1), msg, B=Point.generator()))
+
+    def test_verify_repeated(self):
+        # after precompute, verify uses a table of the key
+        sk = PrivateKey.from_rand()
+        pk = PublicKey.from_private(sk).precompute()
+        for _ in range(3):
+            msg = urandom(32)
+            R, S = sk.sign(msg)
+            self.assertTrue(pk.verify((R, S), msg))
+            self.assertFalse(pk.verify((R, S + 1), msg))
+
+    def test_batch_verify(self):
+        items = []
+        for _ in range(8):
+            sk = PrivateKey.from_rand()
+            msg = urandom(32)
+            items.append((PublicKey.from_private(sk), sk.sign(msg), msg))
+        self.assertTrue(batch_verify(items))
+
+        pk, (R, S), msg = items[3]
+        items[3] = (pk, (R, S), urandom(32))
+        self.assertFalse(batch_verify(items))
+
+        # The batch check is cofactored: R shifted by the point of order 2 is
+        # rejected by verify, but always accepted by batch_verify
+        sk = PrivateKey.from_rand()
+        pk = PublicKey.from_private(sk)
+        msg = urandom(32)
+        r = 1234567
+        R = Point.generator().mult(r) + Point(FQ(0), FQ(-1))
+        h = hash_ram(R, pk.p, msg)
+        S = (r + h * sk.fe.n) % JUBJUB_E
+        self.assertFalse(pk.verify((R, S), msg))
+        for _ in range(8):
+            self.assertTrue(batch_verify([(pk, (R, S), msg)]))
+
+    def test_hash_ram(self):
+        R = Point.generator().mult(1234)
+        A = Point.generator().mult(5678)
+        msg = urandom(32)
+        self.assertEqual(hash_ram(R, A, msg), hash_to_scalar(R, A, msg))
 
 
 if __name__ == "__main__":
@@ -98,6 +98,14 @@ class TestPedersenHash(unittest.TestCase):
             ),
         )
 
+    def test_sized_hasher(self):
+        # hashers of the same name and size share their tables
+        data = urandom(24)
+        self.assertEqual(P(b"test", 64).hash_bytes(data), P(b"test").hash_bytes(data))
+        self.assertEqual(
+            P(b"test", 64).hash_bytes(data), P(b"test", 64).hash_bytes(data)
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -7,9 +7,9 @@ described in the paper "Twisted Edwards Curves Revisited":
 based on: https://github.com/HarryR/ethsnarks
 """
 
-from collections import namedtuple
-from .field import FQ, inv, field_modulus
-from .numbertheory import square_root_mod_prime, SquareRootError
+from functools import lru_cache
+from .field import FQ, batch_inv, inv, field_modulus, sqrt
+from .numbertheory import SquareRootError
 
 # order of the field
 JUBJUB_Q = field_modulus
@@ -20,13 +20,353 @@ JUBJUB_L = JUBJUB_E // JUBJUB_C  # C*L == E
 JUBJUB_A = 168700  # Coefficient A
 JUBJUB_D = 168696  # Coefficient D
 
+# The cofactor is a power of two, cofactor clearing is a chain of doublings
+_COFACTOR_BITS = JUBJUB_C.bit_length() - 1
+assert JUBJUB_C == 1 << _COFACTOR_BITS
+# Scalars reduced modulo the curve order fit in this many bits
+_E_BITS = JUBJUB_E.bit_length()
+
 
 def is_negative(v):
     assert isinstance(v, FQ)
     return v.n < (-v).n
 
 
-class Point(namedtuple("_Point", ("x", "y"))):
+# The extended coordinates used internally by the scalar multiplications are
+# plain ints modulo JUBJUB_Q, so that no FQ objects are allocated per step.
+
+# The neutral element (0, 1) in extended coordinates
+_EXT_INF = (0, 1, 0, 1)
+
+
+def _to_extended(p):
+    "Lifts an affine point (x, y) to extended coordinates (X, Y, T, Z)"
+    x, y = p.x.n, p.y.n
+    return (x, y, x * y % JUBJUB_Q, 1)
+
+
+def _from_extended(e):
+    "Projects extended coordinates back to an affine point, using a single inversion"
+    X, Y, _, Z = e
+    z_inv = inv(Z, JUBJUB_Q)
+    return Point(FQ(X * z_inv), FQ(Y * z_inv))
+
+
+def _batch_from_extended(es):
+    "Projects many points back to affine form, sharing one inversion between all"
+    z_invs = batch_inv([e[3] for e in es], JUBJUB_Q)
+    return [
+        Point(FQ(X * z_inv), FQ(Y * z_inv)) for (X, Y, _, _), z_inv in zip(es, z_invs)
+    ]
+
+
+def _ext_add(p1, p2):
+    """
+    Unified addition in extended coordinates, add-2008-hwcd (HWCD08, section 3.1)
+    Costs 9M and no inversion, also valid for doubling.
+    """
+    (X1, Y1, T1, Z1) = p1
+    (X2, Y2, T2, Z2) = p2
+    A = X1 * X2 % JUBJUB_Q
+    B = Y1 * Y2 % JUBJUB_Q
+    C = JUBJUB_D * T1 * T2 % JUBJUB_Q
+    D = Z1 * Z2 % JUBJUB_Q
+    E = ((X1 + Y1) * (X2 + Y2) - A - B) % JUBJUB_Q
+    F = D - C
+    G = D + C
+    H = B - JUBJUB_A * A
+    return (E * F % JUBJUB_Q, G * H % JUBJUB_Q, E * H % JUBJUB_Q, F * G % JUBJUB_Q)
+
+
+def _ext_double(p1):
+    """
+    Dedicated doubling in extended coordinates, dbl-2008-hwcd (HWCD08, section 3.3)
+    Costs 4M + 4S and no inversion.
+    """
+    (X1, Y1, _, Z1) = p1
+    A = X1 * X1 % JUBJUB_Q
+    B = Y1 * Y1 % JUBJUB_Q
+    C = 2 * Z1 * Z1 % JUBJUB_Q
+    D = JUBJUB_A * A
+    E = ((X1 + Y1) * (X1 + Y1) - A - B) % JUBJUB_Q
+    G = D + B
+    F = G - C
+    H = D - B
+    return (E * F % JUBJUB_Q, G * H % JUBJUB_Q, E * H % JUBJUB_Q, F * G % JUBJUB_Q)
+
+
+def _ext_mul_pow2(p1, k):
+    """
+    Multiplies by 2^k with k successive dbl-2008-hwcd doublings. T is not an
+    input of the doubling, so it is only computed after the last one.
+    """
+    if k == 0:
+        return p1
+    (X, Y, _, Z) = p1
+    for _ in range(k):
+        A = X * X % JUBJUB_Q
+        B = Y * Y % JUBJUB_Q
+        C = 2 * Z * Z % JUBJUB_Q
+        D = JUBJUB_A * A
+        E = ((X + Y) * (X + Y) - A - B) % JUBJUB_Q
+        G = D + B
+        F = G - C
+        H = D - B
+        X, Y, Z = E * F % JUBJUB_Q, G * H % JUBJUB_Q, F * G % JUBJUB_Q
+    return (X, Y, E * H % JUBJUB_Q, Z)
+
+
+def _ext_neg(p1):
+    (X, Y, T, Z) = p1
+    return (JUBJUB_Q - X, Y, JUBJUB_Q - T, Z)
+
+
+def wnaf(scalar, w):
+    """
+    Width-w non-adjacent form of a positive scalar, least significant digit first.
+    Every non-zero digit is odd and lies in (-2^(w-1), 2^(w-1)), and any
+    w consecutive digits contain at most one non-zero digit.
+    """
+    digits = []
+    while scalar > 0:
+        if scalar & 1:
+            d = scalar & ((1 << w) - 1)
+            if d >= 1 << (w - 1):
+                d -= 1 << w
+            scalar -= d
+        else:
+            d = 0
+        digits.append(d)
+        scalar >>= 1
+    return digits
+
+
+# wNAF digits of the subgroup order, recoded once for the subgroup check in `from_hash`
+_L_NAF = wnaf(JUBJUB_L, 5)
+
+
+def wnaf_table(point, w):
+    "Returns the odd multiples [P, 3P, ..., (2^(w-1) - 1)P] in extended coordinates"
+    p = _to_extended(point)
+    table = [p]
+    if w > 2:
+        p2 = _ext_double(p)
+        for _ in range(1, 1 << (w - 2)):
+            table.append(_ext_add(table[-1], p2))
+    return table
+
+
+def wnaf_mult(table, scalar, w):
+    """
+    Multiplies the point described by `table` (see `wnaf_table`) by `scalar`.
+    Compared to plain double-and-add this needs about bits/(w+1) instead of
+    bits/2 additions.
+    """
+    return wnaf_multi_mult([table], [scalar], w)
+
+
+def wnaf_multi_mult(tables, scalars, w):
+    """
+    Straus-Shamir simultaneous multiplication: returns sum(k_i * P_i) where each
+    P_i is described by its `wnaf_table`. All scalars share a single chain of
+    doublings, instead of one chain per multiplication.
+    """
+    nafs = [wnaf(k.n if isinstance(k, FQ) else k, w) for k in scalars]
+    return _wnaf_scan(tables, nafs)
+
+
+def _wnaf_scan(tables, nafs):
+    "Evaluates `wnaf_multi_mult` for scalars that are already in wNAF form"
+    a = _EXT_INF
+    # doublings are deferred until the next addition, runs of zero digits are
+    # then done in one go
+    pending = 0
+    for i in reversed(range(max(map(len, nafs), default=0))):
+        pending += 1
+        for table, digits in zip(tables, nafs):
+            if i >= len(digits) or not digits[i]:
+                continue
+            a = _ext_mul_pow2(a, pending)
+            pending = 0
+            d = digits[i]
+            if d > 0:
+                a = _ext_add(a, table[d >> 1])
+            else:
+                a = _ext_add(a, _ext_neg(table[-d >> 1]))
+    return _from_extended(_ext_mul_pow2(a, pending))
+
+
+def pow2_multiples(point, count, step=1):
+    "Returns [P, 2^step * P, 2^(2*step) * P, ...] with `count` affine points"
+    e = _to_extended(point)
+    es = [e]
+    for _ in range(1, count):
+        e = _ext_mul_pow2(e, step)
+        es.append(e)
+    return _batch_from_extended(es)
+
+
+def comb_table(point, w, bits=256):
+    """
+    Fixed-base table for `comb_mult`: row i holds j * 2^(w*i) * P for 0 <= j <= 2^(w-1),
+    in extended coordinates, covering scalars of up to `bits` bits.
+    Digits are signed, negative ones are looked up as negated entries, which halves
+    the table. One extra bit is covered for the carry of the signed recoding.
+    """
+    rows = []
+    base = _to_extended(point)
+    for _ in range(0, bits + 1, w):
+        row = [_EXT_INF, base]
+        for _ in range(2, (1 << (w - 1)) + 1):
+            row.append(_ext_add(row[-1], base))
+        rows.append(row)
+        base = _ext_double(row[-1])
+    return rows
+
+
+def comb_mult(table, scalar, w):
+    """
+    Multiplies the point described by `table` (see `comb_table`) by `scalar`.
+    Every w-bit digit of the scalar selects one table entry, so this costs one
+    addition per digit and no doublings at all. Digits above 2^(w-1) are taken
+    as negative with a carry into the next digit. Zero digits add the neutral
+    element, so the number of operations does not depend on the scalar.
+    """
+    if isinstance(scalar, FQ):
+        scalar = scalar.n
+    mask = (1 << w) - 1
+    half = 1 << (w - 1)
+    a = _EXT_INF
+    for row in table:
+        d = scalar & mask
+        neg = d > half
+        scalar = (scalar >> w) + neg
+        e = row[mask + 1 - d if neg else d]
+        a = _ext_add(a, (e, _ext_neg(e))[neg])
+    if scalar:
+        raise ValueError("Scalar too large for table")
+    return _from_extended(a)
+
+
+def ladder_mult(point, scalar):
+    """
+    Montgomery ladder over all bits of JUBJUB_E, for secret scalars.
+    Every bit costs one addition and one doubling whatever its value, so
+    unlike `Point.mult` the sequence of operations does not depend on the scalar.
+    """
+    if isinstance(scalar, FQ):
+        scalar = scalar.n
+    scalar %= JUBJUB_E
+    R = [_EXT_INF, _to_extended(point)]
+    for i in reversed(range(_E_BITS)):
+        b = (scalar >> i) & 1
+        R[1 - b] = _ext_add(R[0], R[1])
+        R[b] = _ext_double(R[b])
+    return _from_extended(R[0])
+
+
+def signed_window_table(point):
+    """
+    Lookup table of a 3-bit signed window (b0, b1, sign), in extended coordinates:
+    [P, 2P, 3P, 4P, -P, -2P, -3P, -4P], indexed by the window value itself.
+    """
+    p1 = _to_extended(point)
+    p2 = _ext_double(p1)
+    row = [p1, p2, _ext_add(p2, p1), _ext_double(p2)]
+    return row + [_ext_neg(e) for e in row]
+
+
+def lookup_sum(tables, indices):
+    "Sums tables[i][indices[i]] over all rows, with a single inversion at the end"
+    pairs = zip(tables, indices)
+    row, j = next(pairs, (None, None))
+    if row is None:
+        return _INF
+    # start from the first entry rather than adding it to the neutral element
+    a = row[j]
+    for row, j in pairs:
+        a = _ext_add(a, row[j])
+    return _from_extended(a)
+
+
+# Number of points from which `msm` uses buckets rather than a shared wNAF ladder
+MSM_STRAUS_MAX = 128
+
+
+def msm(scalars, points):
+    """
+    Multi-scalar multiplication sum(k_i * P_i) with Pippenger's bucket method.
+    Per window of c bits every point is added to exactly one bucket and the
+    buckets are combined with a running sum, so the cost grows with the
+    number of points rather than with the number of scalar multiplications.
+    Below `MSM_STRAUS_MAX` points the Straus ladder of `wnaf_multi_mult` is
+    faster, and is used instead.
+    """
+    scalars = [k.n if isinstance(k, FQ) else k for k in scalars]
+    if len(points) < MSM_STRAUS_MAX:
+        return wnaf_multi_mult([wnaf_table(p, 5) for p in points], scalars, 5)
+    points = [_to_extended(p) for p in points]
+    bits = max((k.bit_length() for k in scalars), default=0)
+    c = min(16, max(3, len(points).bit_length() - 3))
+    mask = (1 << c) - 1
+    a = _EXT_INF
+    for shift in reversed(range(0, bits, c)):
+        a = _ext_mul_pow2(a, c)
+        buckets = [None] * mask
+        for k, p in zip(scalars, points):
+            j = (k >> shift) & mask
+            if j:
+                b = buckets[j - 1]
+                buckets[j - 1] = p if b is None else _ext_add(b, p)
+        # sum_j (j * bucket_j), as the sum of all suffix sums
+        running = None
+        for b in reversed(buckets):
+            if b is not None:
+                running = b if running is None else _ext_add(running, b)
+            if running is not None:
+                a = _ext_add(a, running)
+    return _from_extended(a)
+
+
+@lru_cache(maxsize=1024)
+def _decompress(cls, point):
+    "Memoized part of `Point.decompress`, for a 32 byte `bytes` string"
+    # y = int.from_bytes(point, "little")
+    y = int.from_bytes(point, "big")
+    sign = y >> 255
+    y &= (1 << 255) - 1
+    return cls.from_y(FQ(y), sign)
+
+
+class Point(object):
+    """
+    An affine point (x, y) with FQ coordinates. Unpacks like an (x, y) tuple,
+    but is a plain object with two slots, which is cheaper to create and to read.
+    Points are immutable, as instances such as the generator are shared; the
+    slots are only written once, in `__init__`.
+    """
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        _set_x(self, x)
+        _set_y(self, y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Point is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Point is immutable")
+
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
+
+    def __iter__(self):
+        return iter((self.x, self.y))
+
+    def __repr__(self):
+        return "Point(x={!r}, y={!r})".format(self.x, self.y)
+
     def valid(self):
         """
         Satisfies the relationship
@@ -37,28 +377,33 @@ class Point(namedtuple("_Point", ("x", "y"))):
         return (JUBJUB_A * xsq) + ysq == (1 + JUBJUB_D * xsq * ysq)
 
     def add(self, other):
+        """
+        Goes through the extended coordinate formulas, so that the sum costs a
+        single inversion instead of one per affine coordinate.
+        """
         assert isinstance(other, Point)
-        if self.x == 0 and self.y == 0:
+        # the shared neutral element is recognised by identity, without comparisons
+        if self is _INF:
             return other
-        (u1, v1) = (self.x, self.y)
-        (u2, v2) = (other.x, other.y)
-        u3 = (u1 * v2 + v1 * u2) / (FQ.one() + JUBJUB_D * u1 * u2 * v1 * v2)
-        v3 = (v1 * v2 - JUBJUB_A * u1 * u2) / (FQ.one() - JUBJUB_D * u1 * u2 * v1 * v2)
-        return Point(u3, v3)
+        if other is _INF:
+            return self
+        return _from_extended(_ext_add(_to_extended(self), _to_extended(other)))
+
+    def mul_pow2(self, k):
+        "Returns 2^k * self, with k doublings and a single inversion"
+        return _from_extended(_ext_mul_pow2(_to_extended(self), k))
 
     def mult(self, scalar):
+        """
+        Scalar multiplication via the width-w NAF of `scalar`, see `wnaf_mult`.
+        Large scalars use w=5, for small ones the table of odd multiples
+        does not pay off and plain NAF (w=2) is used.
+        """
         if isinstance(scalar, FQ):
             scalar = scalar.n
-        p = self
-        a = self.infinity()
-        i = 0
-        while scalar != 0:
-            if (scalar & 1) != 0:
-                a = a.add(p)
-            p = p.double()
-            scalar = scalar // 2
-            i += 1
-        return a
+        scalar %= JUBJUB_E
+        w = 5 if scalar.bit_length() > 32 else 2
+        return wnaf_mult(wnaf_table(self, w), scalar, w)
 
     def neg(self):
         """
@@ -68,13 +413,25 @@ class Point(namedtuple("_Point", ("x", "y"))):
 
     @classmethod
     def generator(cls):
-        x = 16540640123574156134436876038791482806971768689494387082833631921987005038935
-        y = 20819045374670962167435360035096875258406992893633759881276124905556507972311
-        return Point(FQ(x), FQ(y))
+        return _G
+
+    @classmethod
+    def mult_base(cls, scalar):
+        """
+        Multiplies the generator by `scalar` without any doublings, using a table
+        of the signed digit multiples for each 8-bit position. The table takes a
+        few thousand additions to build, hence it is only created on first use.
+        """
+        global _G_COMB_TABLE
+        if _G_COMB_TABLE is None:
+            _G_COMB_TABLE = comb_table(_G, G_COMB_WINDOW, _E_BITS)
+        if isinstance(scalar, FQ):
+            scalar = scalar.n
+        return comb_mult(_G_COMB_TABLE, scalar % JUBJUB_E, G_COMB_WINDOW)
 
     @staticmethod
     def infinity():
-        return Point(FQ(0), FQ(1))
+        return _INF
 
     def __str__(self):
         return "x: {}, y:{}".format(*self)
@@ -95,7 +452,7 @@ class Point(namedtuple("_Point", ("x", "y"))):
         return self.mult(n)
 
     def double(self):
-        return self.add(self)
+        return _from_extended(_ext_double(_to_extended(self)))
 
     @classmethod
     def from_x(cls, x):
@@ -108,7 +465,7 @@ class Point(namedtuple("_Point", ("x", "y"))):
         ax2 = JUBJUB_A * xsq
         dxsqm1 = inv(JUBJUB_D * xsq - 1, JUBJUB_Q)
         ysq = dxsqm1 * (ax2 - 1)
-        y = FQ(square_root_mod_prime(int(ysq), JUBJUB_Q))
+        y = FQ(sqrt(ysq.n))
         return cls(x, y)
 
     @classmethod
@@ -121,7 +478,7 @@ class Point(namedtuple("_Point", ("x", "y"))):
         lhs = ysq - 1
         rhs = JUBJUB_D * ysq - JUBJUB_A
         xsq = lhs / rhs
-        x = FQ(square_root_mod_prime(int(xsq), JUBJUB_Q))
+        x = FQ(sqrt(xsq.n))
         if sign is not None:
             # Used for compress & decompress
             if (x.n & 1) != sign:
@@ -165,11 +522,13 @@ class Point(namedtuple("_Point", ("x", "y"))):
                 continue
 
             # Multiply point by cofactor, ensures it's on the prime-order subgroup
-            p = p * JUBJUB_C
+            p = _from_extended(_ext_mul_pow2(_to_extended(p), _COFACTOR_BITS))
 
-            # Verify point is on prime-ordered sub-group
-            if (p * JUBJUB_L) != Point.infinity():
-                raise RuntimeError("Point not on prime-ordered subgroup")
+            # Verify point is on prime-ordered sub-group. As E = C*L with L prime this
+            # holds for every cofactor-cleared point, so the check is skipped under -O
+            if __debug__:
+                if _wnaf_scan([wnaf_table(p, 5)], [_L_NAF]) != Point.infinity():
+                    raise RuntimeError("Point not on prime-ordered subgroup")
 
             return p
 
@@ -198,11 +557,27 @@ class Point(namedtuple("_Point", ("x", "y"))):
         as follows: parse the first b-1 bits as y, compute `xx = (y^2 - 1) / (dy^2 - a)`;
         compute `x = [+ or -] sqrt(xx)` where the `[+ or -]` is chosen so that the sign of
         `x` matches the `b`th bit of the string. if `xx` is not a square then parsing fails.
+
+        Results are memoized, as the same public keys tend to be decompressed
+        over and over. Any bytes-like `point` is copied to `bytes` for the cache.
         """
         if len(point) != 32:
             raise ValueError("Invalid input length for decompression")
-        # y = int.from_bytes(point, "little")
-        y = int.from_bytes(point, "big")
-        sign = y >> 255
-        y &= (1 << 255) - 1
-        return cls.from_y(FQ(y), sign)
+        return _decompress(cls, bytes(point))
+
+
+# Writers of the slots, bypassing the __setattr__ that makes Point immutable
+_set_x = Point.x.__set__
+_set_y = Point.y.__set__
+
+# Points are immutable, hence the generator and the neutral element are shared
+# instead of rebuilt per call
+_INF = Point(FQ(0), FQ(1))
+_G = Point(
+    FQ(16540640123574156134436876038791482806971768689494387082833631921987005038935),
+    FQ(20819045374670962167435360035096875258406992893633759881276124905556507972311),
+)
+
+# Digit width of the fixed-base table of the generator, built on first use
+G_COMB_WINDOW = 8
+_G_COMB_TABLE = None
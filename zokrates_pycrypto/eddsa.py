@@ -31,13 +31,35 @@ based on: https://github.com/HarryR/ethsnarks
 
 import hashlib
 from collections import namedtuple
-from math import ceil, log2
 from os import urandom
 
-from .babyjubjub import JUBJUB_E, JUBJUB_L, JUBJUB_Q, Point
-from .field import FQ
+from .babyjubjub import (
+    JUBJUB_E,
+    JUBJUB_L,
+    JUBJUB_Q,
+    Point,
+    comb_mult,
+    comb_table,
+    ladder_mult,
+    msm,
+    wnaf_multi_mult,
+    wnaf_table,
+)
+from .field import FQ, field_bytes
 from .utils import to_bytes
 
+# Random bytes drawn per private key, one more than JUBJUB_L needs to keep
+# the bias of the modular reduction negligible (as in ethsnarks)
+_NBYTES_L = (JUBJUB_L.bit_length() + 7) // 8 + 1
+
+# Width of the signed window used for multiples of the default generator
+B_WINDOW = 5
+# Odd multiples of the default generator, shared by all verify calls
+_B_TABLE = wnaf_table(Point.generator(), B_WINDOW)
+
+# Digit width of the fixed-base table of a public key, see `PublicKey.precompute`
+A_COMB_WINDOW = 4
+
 
 class PrivateKey(namedtuple("_PrivateKey", ("fe"))):
     """
@@ -45,26 +67,32 @@ class PrivateKey(namedtuple("_PrivateKey", ("fe"))):
     """
 
     @classmethod
-    # FIXME: ethsnarks creates keys > 32bytes. Create issue.
     def from_rand(cls):
-        mod = JUBJUB_L
-        # nbytes = ceil(ceil(log2(mod)) / 8) + 1
-        nbytes = ceil(ceil(log2(mod)) / 8)
-        rand_n = int.from_bytes(urandom(nbytes), "little")
-        return cls(FQ(rand_n))
-
-    def sign(self, msg, B=None):
-        "Returns the signature (R,S) for a given private key and message."
-        B = B or Point.generator()
-
-        A = PublicKey.from_private(self)  # A = kB
+        "Returns a uniformly random key in [0, JUBJUB_L)."
+        rand_n = int.from_bytes(urandom(_NBYTES_L), "little")
+        return cls(FQ(rand_n % JUBJUB_L))
+
+    def _public_point(self):
+        "Returns A = kB for the default generator, computed once per key."
+        try:
+            return self._A
+        except AttributeError:
+            self._A = PublicKey.from_private(self).p
+            return self._A
+
+    def sign(self, msg, B=None, pk=None):
+        """
+        Returns the signature (R,S) for a given private key and message.
+        The matching PublicKey can be passed as `pk` to skip deriving it.
+        """
+        A = pk.p if pk is not None else self._public_point()  # A = kB
 
         M = msg
         r = hash_to_scalar(self.fe, M)  # r = H(k,M) mod L
-        R = B.mult(r)  # R = rB
+        R = Point.mult_base(r) if B is None else ladder_mult(B, r)  # R = rB
 
         # Bind the message to the nonce, public key and message
-        hRAM = hash_to_scalar(R, A, M)
+        hRAM = hash_ram(R, A, M) % JUBJUB_E  # reduce before multiplying with k
         key_field = self.fe.n
         S = (r + (key_field * hRAM)) % JUBJUB_E  # r + (H(R,A,M) * k)
 
@@ -79,27 +107,77 @@ class PublicKey(namedtuple("_PublicKey", ("p"))):
     @classmethod
     def from_private(cls, sk, B=None):
         "Returns public key for a private key. B denotes the group generator"
-        B = B or Point.generator()
         if not isinstance(sk, PrivateKey):
             sk = PrivateKey(sk)
-        A = B.mult(sk.fe)
+        A = Point.mult_base(sk.fe) if B is None else ladder_mult(B, sk.fe)
         return cls(A)
 
-    def verify(self, sig, msg, B=None):
-        B = B or Point.generator()
+    def precompute(self):
+        """
+        Builds the fixed-base table of -A, which makes every later `verify` of this
+        key with the default generator about three times faster. Building it costs
+        about one and a half verifications, and the table keeps about 170 KiB alive
+        for as long as the key, hence it is only built on request. Returns the key.
+        """
+        bits = JUBJUB_E.bit_length()
+        self._neg_A_table = comb_table(self.p.neg(), A_COMB_WINDOW, bits)
+        return self
 
+    def verify(self, sig, msg, B=None):
         R, S = sig
         M = msg
         A = self.p
 
-        lhs = B.mult(S)
+        hRAM = hash_ram(R, A, M) % JUBJUB_E
+
+        if B is None:
+            if isinstance(S, FQ):
+                S = S.n
+            table = getattr(self, "_neg_A_table", None)
+            if table is not None:
+                # S*B - hRAM*A == R, both products looked up without doublings
+                return Point.mult_base(S) + comb_mult(table, hRAM, A_COMB_WINDOW) == R
+            # S*B - hRAM*A == R, with the doublings of both products shared
+            tables = [_B_TABLE, wnaf_table(A.neg(), B_WINDOW)]
+            lhs = wnaf_multi_mult(tables, [S % JUBJUB_E, hRAM], B_WINDOW)
+            return lhs == R
 
-        hRAM = hash_to_scalar(R, A, M)
+        lhs = B.mult(S)
         rhs = R + (A.mult(hRAM))
 
         return lhs == rhs
 
 
+def batch_verify(items):
+    """
+    Verifies many (pk, sig, msg) triples at once. Returns True only if all are valid.
+
+    Checks `(sum z_i*S_i)*B == sum z_i*R_i + sum (z_i*h_i)*A_i` for random 128bit
+    weights z_i, which replaces 2N scalar multiplications by one fixed-base
+    multiplication and one multi-scalar multiplication. An invalid signature
+    passes with negligible probability, though unlike `verify` the combined
+    check does not pinpoint which one failed.
+
+    The check is cofactored: both sides are compared after multiplying by the
+    cofactor 8. Otherwise a small-order component of some R or A would drop out
+    whenever its weight z_i is a multiple of its order, and the result would depend
+    on the random weights. Hence it accepts a superset of `verify`, namely also
+    signatures whose R or A differ from valid ones by a point of small order.
+    """
+    s_sum = 0
+    scalars = []
+    points = []
+    for pk, (R, S), msg in items:
+        z = int.from_bytes(urandom(16), "big")
+        h = hash_ram(R, pk.p, msg)
+        s_sum += z * int(S)
+        scalars += [z, (z * h) % JUBJUB_E]
+        points += [R, pk.p]
+    # 8*(s_sum*B - sum z_i*R_i - sum (z_i*h_i)*A_i) == O, as 8 = 2^3
+    diff = Point.mult_base(s_sum) - msm(scalars, points)
+    return diff.mul_pow2(3) == Point.infinity()
+
+
 def hash_to_scalar(*args):
     """
     Hash the key and message to create `r`, the blinding factor for this signature.
@@ -108,6 +186,19 @@ def hash_to_scalar(*args):
     Note that we take the entire 256bit hash digest as input for the scalar multiplication.
     As the group is only of size JUBJUB_E (<256bit) we allow wrapping around the group modulo.
     """
-    p = b"".join(to_bytes(_) for _ in args)
+    digest = hashlib.sha256(to_bytes(*args)).digest()
+    # mod JUBJUB_E here for optimized implementation
+    return int.from_bytes(digest, "big")
+
+
+def hash_ram(R, A, M):
+    """
+    Specialisation of `hash_to_scalar(R, A, M)` for the challenge `H(R, A, M)`.
+    The x coordinates of both points are packed directly instead of going
+    through the generic `to_bytes` dispatch. Returns the same value.
+    """
+    if not isinstance(M, bytes):
+        M = to_bytes(M)
+    p = R.x.n.to_bytes(field_bytes, "big") + A.x.n.to_bytes(field_bytes, "big") + M
     digest = hashlib.sha256(p).digest()
-    return int(digest.hex(), 16)  # mod JUBJUB_E here for optimized implementation
+    return int.from_bytes(digest, "big")
@@ -9,6 +9,15 @@ from __future__ import absolute_import
 
 from typing import cast, List, Tuple, Sequence, Union
 
+from .numbertheory import SquareRootError  # CHANGE: raised by `sqrt`
+
+# CHANGE: GMP's modular inverse and exponentiation are used if gmpy2 is installed.
+# Results are converted back to int, field elements always hold plain ints.
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
 
 # The prime modulus of the field
 # field_modulus = 21888242871839275222246405745257275088696311157297823662689037894645226208583
@@ -20,24 +29,84 @@ field_modulus = (
 # See, it's prime!
 assert pow(2, field_modulus, field_modulus) == 2
 
+# CHANGE: Length of a field element in bytes, computed once for serialisation
+field_bytes = (field_modulus.bit_length() + 7) // 8
+
 # The modulus of the polynomial in this representation of FQ12
 # FQ12_MODULUS_COEFFS = (82, 0, 0, 0, 0, 0, -18, 0, 0, 0, 0, 0)  # Implied + [1]
 # FQ2_MODULUS_COEFFS = (1, 0)
 # CHANGE: No need for extended  in this case
 
-# Extended euclidean algorithm to find modular inverses for
-# integers
+# CHANGE: Modular inverse with the built-in pow (Python 3.8+), which runs the
+# extended euclidean algorithm in C, or with gmpy2. Zero is mapped to zero as before.
 def inv(a: int, n: int) -> int:
+    num = (a if isinstance(a, int) else a.n) % n
+    if num == 0:
+        return 0
+    if gmpy2 is not None:
+        return int(gmpy2.invert(num, n))
+    return pow(num, -1, n)
+
+
+# CHANGE: Modular exponentiation, with gmpy2 if available
+def powmod(a: int, e: int, n: int) -> int:
+    if gmpy2 is not None:
+        return int(gmpy2.powmod(a, e, n))
+    return pow(a, e, n)
+
+
+# CHANGE: Montgomery's trick, inverts all values with a single call to `inv`
+# and 3(k-1) multiplications. None of the values may be zero.
+def batch_inv(values: Sequence[int], n: int) -> List[int]:
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        acc = acc * v % n
+    acc_inv = inv(acc, n)
+    result = [0] * len(values)
+    for i in reversed(range(len(values))):
+        result[i] = prefix[i] * acc_inv % n
+        acc_inv = acc_inv * values[i] % n
+    return result
+
+
+# CHANGE: Square roots. field_modulus - 1 = 2^s * t with s = 28, so Tonelli-Shanks
+# is used, where the discrete log of the 2^s-th root of unity a^t is read off a
+# table of the 2^w-th roots of unity, w bits at a time.
+_SQRT_S = ((field_modulus - 1) & -(field_modulus - 1)).bit_length() - 1
+_SQRT_T = (field_modulus - 1) >> _SQRT_S
+_SQRT_W = 7
+assert _SQRT_S % _SQRT_W == 0
+# g = z^t generates the 2^s-th roots of unity, for the smallest non-residue z
+_SQRT_Z = next(
+    z for z in range(2, 100) if pow(z, field_modulus >> 1, field_modulus) != 1
+)
+_SQRT_G = pow(_SQRT_Z, _SQRT_T, field_modulus)
+_SQRT_G_INV = inv(_SQRT_G, field_modulus)
+_SQRT_ROOTS = {
+    pow(_SQRT_G, j << (_SQRT_S - _SQRT_W), field_modulus): j
+    for j in range(1 << _SQRT_W)
+}
+
+
+def sqrt(a: int) -> int:
+    p = field_modulus
+    a %= p
     if a == 0:
         return 0
-    lm, hm = 1, 0
-    num = a if isinstance(a, int) else a.n
-    low, high = num % n, n
-    while low > 1:
-        r = high // low
-        nm, new = hm - lm * r, high - low * r
-        lm, low, hm, high = nm, new, lm, low
-    return lm % n
+    u = powmod(a, (_SQRT_T - 1) // 2, p)
+    b = a * u * u % p  # a^t, has order dividing 2^s
+    r = a * u % p  # a^((t+1)/2), the root up to a factor b^(1/2)
+    # find e with b = g^e, w bits at a time, lowest bits first
+    e = 0
+    for i in range(0, _SQRT_S, _SQRT_W):
+        c = b * pow(_SQRT_G_INV, e, p) % p
+        e += _SQRT_ROOTS[pow(c, 1 << (_SQRT_S - _SQRT_W - i), p)] << i
+        # a is a square exactly if e is even, which is known after the first window
+        if e & 1:
+            raise SquareRootError("%d has no square root modulo %d" % (a, p))
+    return r * pow(_SQRT_G_INV, e >> 1, p) % p
 
 
 IntOrFQ = Union[int, "FQ"]
@@ -46,7 +115,9 @@ IntOrFQ = Union[int, "FQ"]
 # A class for field elements in FQ. Wrap a number in this class,
 # and it becomes a field element.
 class FQ(object):
-    n = None  # type: int
+    # CHANGE: field elements are created for every intermediate result, without
+    # an instance dict they are cheaper to allocate and to read from
+    __slots__ = ("n",)
 
     def __init__(self, val: IntOrFQ) -> None:
         if isinstance(val, FQ):
@@ -55,13 +126,26 @@ class FQ(object):
             self.n = val % field_modulus
         assert isinstance(self.n, int)
 
+    # CHANGE: results of arithmetic between two FQs are already reduced ints, they
+    # are wrapped without another `% field_modulus` and type check in __init__.
+    # Other operands still go through __init__.
+    @staticmethod
+    def _wrap(n: int) -> "FQ":
+        o = object.__new__(FQ)
+        o.n = n
+        return o
+
     def __add__(self, other: IntOrFQ) -> "FQ":
-        on = other.n if isinstance(other, FQ) else other
-        return FQ((self.n + on) % field_modulus)
+        # CHANGE: the sum of two reduced elements needs at most one subtraction
+        if other.__class__ is FQ:
+            n = self.n + other.n
+            return FQ._wrap(n - field_modulus if n >= field_modulus else n)
+        return FQ(self.n + other)
 
     def __mul__(self, other: IntOrFQ) -> "FQ":
-        on = other.n if isinstance(other, FQ) else other
-        return FQ((self.n * on) % field_modulus)
+        if other.__class__ is FQ:
+            return FQ._wrap(self.n * other.n % field_modulus)
+        return FQ(self.n * other)
 
     def __rmul__(self, other: IntOrFQ) -> "FQ":
         return self * other
@@ -70,12 +154,14 @@ class FQ(object):
         return self + other
 
     def __rsub__(self, other: IntOrFQ) -> "FQ":
-        on = other.n if isinstance(other, FQ) else other
-        return FQ((on - self.n) % field_modulus)
+        return FQ(other - self.n)
 
     def __sub__(self, other: IntOrFQ) -> "FQ":
-        on = other.n if isinstance(other, FQ) else other
-        return FQ((self.n - on) % field_modulus)
+        # CHANGE: the difference of two reduced elements needs at most one addition
+        if other.__class__ is FQ:
+            n = self.n - other.n
+            return FQ._wrap(n + field_modulus if n < 0 else n)
+        return FQ(self.n - other)
 
     def __div__(self, other: IntOrFQ) -> "FQ":
         on = other.n if isinstance(other, FQ) else other
@@ -94,14 +180,11 @@ class FQ(object):
         return self.__rdiv__(other)
 
     def __pow__(self, other: int) -> "FQ":
-        if other == 0:
-            return FQ(1)
-        elif other == 1:
-            return FQ(self.n)
-        elif other % 2 == 0:
-            return (self * self) ** (other // 2)
-        else:
-            return ((self * self) ** int(other // 2)) * self
+        # CHANGE: built-in modular exponentiation instead of recursive squaring,
+        # a negative exponent raises the inverse
+        if other < 0:
+            return FQ._wrap(powmod(inv(self.n, field_modulus), -other, field_modulus))
+        return FQ._wrap(powmod(self.n, other, field_modulus))
 
     def __eq__(
         self, other: IntOrFQ
@@ -117,7 +200,7 @@ class FQ(object):
         return not self == other
 
     def __neg__(self) -> "FQ":
-        return FQ(-self.n)
+        return FQ._wrap(-self.n % field_modulus)
 
     def __repr__(self) -> str:
         return repr(self.n)
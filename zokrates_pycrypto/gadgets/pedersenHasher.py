@@ -1,20 +1,19 @@
-import math
 import bitstring
-from math import floor, log2
-from struct import pack
+from functools import lru_cache
 
-from ..babyjubjub import Point, JUBJUB_L, JUBJUB_C
-from ..field import FQ
+from ..babyjubjub import Point, lookup_sum, pow2_multiples, signed_window_table
 
 WINDOW_SIZE_BITS = 2  # Size of the pre-computed look-up table
 
 
+@lru_cache(maxsize=1024)
 def pedersen_hash_basepoint(name, i):
     """
     Create a base point for use with the windowed Pedersen
     hash function.
     The name and sequence numbers are used as a unique identifier.
     Then HashToPoint is run on the name+seq to get the base point.
+    Base points are cached, hashers with the same name share them.
     """
     if not isinstance(name, bytes):
         if isinstance(name, str):
@@ -29,11 +28,41 @@ def pedersen_hash_basepoint(name, i):
     return Point.from_hash(data)
 
 
+@lru_cache(maxsize=64)
+def pedersen_generators(name, segments):
+    """
+    Returns the generators of the first `segments` windows: a new base point
+    every 62 windows, each followed by its multiples 16^i * base.
+    Shared by all hashers with the same name and size.
+    """
+    generators = []
+    # TODO: define `62`,
+    for j in range(0, segments, 62):
+        base = pedersen_hash_basepoint(name, j // 62)
+        generators += pow2_multiples(base, min(62, segments - j), 4)
+    return tuple(generators)
+
+
+@lru_cache(maxsize=64)
+def _lookup_table(name, segments):
+    "Signed window tables of the generators, see `signed_window_table`"
+    return tuple(signed_window_table(g) for g in pedersen_generators(name, segments))
+
+
+# The bits of every 3-bit window, least significant first
+_WINDOW_BITS = tuple("{:03b}".format(i)[::-1] for i in range(8))
+
+# Maps every byte to the byte with its bits in reverse order
+_BIT_REVERSE = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
+
+
+def _int_to_windows(m, nbits):
+    "Splits the lowest `nbits` bits of `m` into 3-bit windows, lowest first"
+    return [(m >> i) & 0b111 for i in range(0, nbits, 3)]
+
+
 def windows_to_dsl_array(windows):
-    bit_windows = (bitstring.BitArray(bin(i)).bin[::-1] for i in windows)
-    bit_windows_padded = ("{:0<3}".format(w) for w in bit_windows)
-    bitstr = "".join(bit_windows_padded)
-    return list(bitstr)
+    return list("".join(_WINDOW_BITS[w] for w in windows))
 
 
 class PedersenHasher(object):
@@ -49,27 +78,17 @@ class PedersenHasher(object):
         assert (
             self.is_sized == True
         ), "Hasher size must be defined first, before lookup table can be created"
-        generators = self.generators
+        generators = pedersen_generators(self.name, self.segments)
         table = []
         for p in generators:
-            row = [p.mult(i + 1) for i in range(0, WINDOW_SIZE_BITS ** 2)]
+            # [p, 2p, 3p, 4p], one doubling and addition each instead of a scalar mult
+            p2 = p.double()
+            row = [p, p2, p2 + p, p2.double()]
             table.append(row)
         return table
 
     def __gen_generators(self):
-
-        name = self.name
-        segments = self.segments
-        generators = []
-        for j in range(0, segments):
-            # TODO: define `62`,
-            if j % 62 == 0:
-                current = pedersen_hash_basepoint(name, j // 62)
-            j = j % 62
-            if j != 0:
-                current = current.double().double().double().double()
-            generators.append(current)
-        return generators
+        return list(pedersen_generators(self.name, self.segments))
 
     def __hash_windows(self, windows, witness):
 
@@ -96,22 +115,18 @@ class PedersenHasher(object):
         if witness:
             return windows_to_dsl_array(windows)
 
-        result = Point.infinity()
-        for (g, window) in zip(self.generators, windows):
-            segment = g * ((window & 0b11) + 1)
-            if window > 0b11:
-                segment = segment.neg()
-            result += segment
-        return result
+        # each window selects one of [g, 2g, 3g, 4g, -g, -2g, -3g, -4g]
+        return lookup_sum(_lookup_table(self.name, segments), windows)
 
     def hash_bits(self, bits, witness=False):
-        # Split into 3 bit windows
+        # Split into 3 bit windows, the first bit being the lowest bit of a window.
+        # Read in reverse, the bits form one integer that is cut 3 bits at a time.
         if isinstance(bits, bitstring.BitArray):
             bits = bits.bin
-        windows = [int(bits[i : i + 3][::-1], 2) for i in range(0, len(bits), 3)]
-        assert len(windows) > 0
+        assert len(bits) > 0
+        m = int(bits[::-1], 2)
 
-        return self.__hash_windows(windows, witness)
+        return self.__hash_windows(_int_to_windows(m, len(bits)), witness)
 
     def hash_bytes(self, data, witness=False):
         """
@@ -124,10 +139,12 @@ class PedersenHasher(object):
         assert isinstance(data, bytes)
         assert len(data) > 0
 
-        # Decode bytes to octets of binary bits
-        bits = "".join([bin(_)[2:].rjust(8, "0") for _ in data])
+        # Windows are read from the bits of every byte, most significant first, with
+        # the first bit as the lowest bit of a window. Reversing the bits of every
+        # byte turns this into the little-endian integer read 3 bits at a time.
+        m = int.from_bytes(data.translate(_BIT_REVERSE), "little")
 
-        return self.hash_bits(bits, witness)
+        return self.__hash_windows(_int_to_windows(m, 8 * len(data)), witness)
 
     def hash_scalars(self, *scalars, witness=False):
         """
@@ -1,30 +1,60 @@
 from bitstring import BitArray
 
 from .babyjubjub import Point
-from .field import FQ
+from .field import FQ, field_bytes
 import hashlib
 
 
+def _write_point(buf, M):
+    buf += M.x.n.to_bytes(field_bytes, "big")
+
+
+def _write_fq(buf, M):
+    buf += M.n.to_bytes(field_bytes, "big")
+
+
+def _write_int(buf, M):
+    buf += M.to_bytes(field_bytes, "big")
+
+
+def _write_bytes(buf, M):
+    buf += M
+
+
+# Writers for the exact types, looked up before falling back to isinstance checks
+_WRITERS = {
+    Point: _write_point,
+    FQ: _write_fq,
+    int: _write_int,
+    bytes: _write_bytes,
+    bytearray: _write_bytes,
+}
+
+
 def to_bytes(*args):
     "Returns byte representation for objects used in this module."
-    result = b""
-    for M in args:
-        if isinstance(M, Point):
-            result += to_bytes(M.x)
-            # result += to_bytes(M.y)
+    result = bytearray()
+    pending = list(reversed(args))
+    while pending:
+        M = pending.pop()
+        write = _WRITERS.get(type(M))
+        if write is not None:
+            write(result, M)
+        elif isinstance(M, Point):
+            _write_point(result, M)
         elif isinstance(M, FQ):
-            result += to_bytes(M.n)
+            _write_fq(result, M)
         elif isinstance(M, int):
-            result += M.to_bytes(32, "big")
+            _write_int(result, M)
         elif isinstance(M, BitArray):
             result += M.tobytes()
-        elif isinstance(M, bytes):
+        elif isinstance(M, (bytes, bytearray)):
             result += M
         elif isinstance(M, (list, tuple)):
-            result += b"".join(to_bytes(_) for _ in M)
+            pending.extend(reversed(M))
         else:
             raise TypeError("Bad type for M: " + str(type(M)))
-    return result
+    return bytes(result)
 
 
 def write_signature_for_zokrates_cli(pk, sig, msg, path):
@@ -33,11 +63,9 @@ def write_signature_for_zokrates_cli(pk, sig, msg, path):
     args = [sig_R.x, sig_R.y, sig_S, pk.p.x.n, pk.p.y.n]
     args = " ".join(map(str, args))
 
-    M0 = msg.hex()[:64]
-    M1 = msg.hex()[64:]
-    b0 = [str(int(M0[i:i+8], 16)) for i in range(0,len(M0), 8)]
-    b1 = [str(int(M1[i:i+8], 16)) for i in range(0,len(M1), 8)]
-    args = args + " " + " ".join(b0 + b1)
+    # M0 and M1 as 32bit words, read straight from the message bytes
+    words = [str(int.from_bytes(msg[i : i + 4], "big")) for i in range(0, len(msg), 4)]
+    args = args + " " + " ".join(words)
 
     with open(path, "w+") as file:
         for l in args:
@@ -46,7 +74,7 @@ def write_signature_for_zokrates_cli(pk, sig, msg, path):
 
 def pprint_hex_as_256bit(n, h):
     "Takes a variable name and a hex encoded number and returns Zokrates assignment statement."
-    b = BitArray(int(h, 16).to_bytes(32, "big")).bin
+    b = format(int(h, 16), "0256b")
     s = "[" + ", ".join(b) + "]"
     return "field[256] {} = {} \n".format(n, s)
 